@@ -1,6 +1,30 @@
 import re
+import string
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 
 @dataclass
@@ -10,20 +34,55 @@ class Email:
     body: str
 
 
-FREE_DOMAINS = {
+@dataclass(frozen=True, slots=True)
+class Features:
+    sender_domain: str
+    sender_is_free_domain: bool
+    role_hits: int
+    urgency_hits: int
+    money_mentions: Tuple[str, ...]
+    urls: Tuple[str, ...]
+    phones: Tuple[str, ...]
+    length: int
+
+    @property
+    def mentions_roles(self) -> bool:
+        return self.role_hits > 0
+
+    @property
+    def mentions_urgency(self) -> bool:
+        return self.urgency_hits > 0
+
+    def as_dict(self) -> Dict:
+        # Legacy JSON-friendly feature dict returned by decide_action/decide_actions.
+        return {
+            "sender_domain": self.sender_domain,
+            "sender_is_free_domain": self.sender_is_free_domain,
+            "mentions_roles": self.mentions_roles,
+            "role_hits": self.role_hits,
+            "mentions_urgency": self.mentions_urgency,
+            "urgency_hits": self.urgency_hits,
+            "money_mentions": list(self.money_mentions),
+            "urls": list(self.urls),
+            "phones": list(self.phones),
+            "length": self.length,
+        }
+
+
+FREE_DOMAINS = frozenset({
     "gmail.com", "yahoo.com", "hotmail.com", "outlook.com", "live.com", "icloud.com", "proton.me", "protonmail.com"
-}
+})
 
-ROLE_TERMS = [
+ROLE_TERMS = frozenset([
     "ceo", "cfo", "coo", "cto", "chairman", "board", "director", "vp", "vice president",
     "general counsel", "legal counsel", "head of", "founder", "owner", "president",
     "dirección", "director", "consejo", "presidente", "propietario", "fundador", "asesoría jurídica"
-]
+])
 
-URGENCY_TERMS = [
+URGENCY_TERMS = frozenset([
     "urgent", "asap", "immediately", "today", "right away", "time-sensitive", "confidential",
     "urgente", "inmediato", "hoy", "confidencial", "reservado"
-]
+])
 
 SECURITY_TERMS = [
     "password", "reset", "2fa", "authentication", "login", "breach", "hack", "phishing",
@@ -32,6 +91,12 @@ SECURITY_TERMS = [
     "transferencia", "cambiar pago", "cambio de cuenta", "datos bancarios"
 ]
 
+STRONG_SECURITY_TERMS = [
+    "breach", "hack", "phishing", "wire transfer", "bank details", "datos bancarios", "transferencia"
+]
+
+URL_CUE_TERMS = frozenset(["http", "www."])
+
 INTENT_RULES = {
     "M_AND_A": {
         "weight": 5,
@@ -70,133 +135,374 @@ INTENT_RULES = {
 }
 
 
+_COMPILED_RULES = tuple(
+    (intent, rule["weight"], frozenset(term.lower() for term in rule["terms"]))
+    for intent, rule in INTENT_RULES.items()
+)
+
+TERM_CATEGORIES = {
+    **{intent: terms for intent, _, terms in _COMPILED_RULES},
+    "ROLES": ROLE_TERMS,
+    "URGENCY": URGENCY_TERMS,
+    "STRONG_SECURITY": STRONG_SECURITY_TERMS,
+    "URL_CUES": URL_CUE_TERMS,
+}
+
+CATEGORY_BITS = {category: 1 << i for i, category in enumerate(TERM_CATEGORIES)}
+STRONG_SECURITY_BIT = CATEGORY_BITS["STRONG_SECURITY"]
+
+_TERM_INDEX: Dict[str, int] = {}
+for _category, _terms in TERM_CATEGORIES.items():
+    for _term in _terms:
+        _key = _term.lower()
+        _TERM_INDEX[_key] = _TERM_INDEX.get(_key, 0) | CATEGORY_BITS[_category]
+
+
+def _build_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for key, bits in _TERM_INDEX.items():
+        automaton.add_word(key, (key, bits))
+    automaton.make_automaton()
+    return automaton
+
+
+_AUTOMATON = _build_automaton()
+
+
+def scan_terms(*texts_lower: str) -> Tuple[Dict[str, Set[str]], int]:
+    # One pass over each lowercased text (e.g. subject and body); every category is bucketed from
+    # the same hits and the returned mask has the CATEGORY_BITS of every category that matched.
+    found = set()
+    for text_lower in texts_lower:
+        if _AUTOMATON is not None:
+            found.update(match for _, match in _AUTOMATON.iter(text_lower))
+        else:
+            found.update((key, bits) for key, bits in _TERM_INDEX.items() if key in text_lower)
+    return _bucket_hits(found)
+
+
+def scan_terms_batch(texts_lower: List[Tuple[str, ...]]) -> List[Tuple[Dict[str, Set[str]], int]]:
+    # Same as scan_terms for many emails, walking the automaton once over all their "\x00"-joined texts.
+    if _AUTOMATON is None:
+        return [scan_terms(*parts) for parts in texts_lower]
+
+    parts = [part for email_parts in texts_lower for part in email_parts]
+    owners = [i for i, email_parts in enumerate(texts_lower) for _ in email_parts]
+    ends = list(accumulate(len(part) + 1 for part in parts))
+    found = [set() for _ in texts_lower]
+    for end_idx, match in _AUTOMATON.iter("\x00".join(parts)):
+        found[owners[bisect_right(ends, end_idx)]].add(match)
+    return [_bucket_hits(f) for f in found]
+
+
+def _bucket_hits(found: Set[Tuple[str, int]]) -> Tuple[Dict[str, Set[str]], int]:
+    hits = {category: set() for category in TERM_CATEGORIES}
+    seen_mask = 0
+    for key, bits in found:
+        seen_mask |= bits
+        for category, bit in CATEGORY_BITS.items():
+            if bits & bit:
+                hits[category].add(key)
+    return hits, seen_mask
+
+
+_DIGIT_RE = re.compile(r"\d")
+_DOMAIN_RE = re.compile(r"@([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+_DOMAIN_CHARS = string.ascii_letters + string.digits + ".-"
+# The URL and money patterns run on already-lowercased text, so they are compiled case-sensitively;
+# the *_CI variants are only used on the rare texts whose lowercased form has different offsets.
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_URL_RE_CI = re.compile(_URL_RE.pattern, re.IGNORECASE)
+_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+# "€"/"$" amounts, "<n> million"-style magnitudes and "<nn> €"/"<nn> $" suffixed amounts, with the
+# shared prefixes factored out so the engine can still skip ahead to a currency sign or a digit.
+_MONEY_RE = re.compile(
+    r"[€$]\s?\d[\d.,]*\b"
+    r"|\b\d(?:[\d.,]*\s?(?:m|million|millones|b|billion|mil)\b|\d+\s?[€$]\b)"
+)
+_MONEY_RE_CI = re.compile(_MONEY_RE.pattern, re.IGNORECASE)
+
+
 def extract_email_domain(sender: str) -> Optional[str]:
-    m = re.search(r"@([A-Za-z0-9.-]+\.[A-Za-z]{2,})", sender)
+    at = sender.find("@")
+    if at < 0:
+        return None
+    # Fast path for plain "user@domain" / "Name <user@domain>" senders; anything unusual
+    # (several "@", stray characters) goes through the regex so the result is the same.
+    domain = sender[at + 1:].rstrip(" \t\r\n>")
+    base, _, tld = domain.rpartition(".")
+    if base and len(tld) >= 2 and tld.isalpha() and not domain.strip(_DOMAIN_CHARS):
+        return domain.lower()
+    m = _DOMAIN_RE.search(sender)
     return m.group(1).lower() if m else None
 
 
-def contains_any(text: str, terms: List[str]) -> bool:
-    t = text.lower()
-    return any(term in t for term in terms)
+def is_free_domain(domain: str) -> bool:
+    # Also matches subdomains of free providers, e.g. "mail.gmail.com".
+    while domain:
+        if domain in FREE_DOMAINS:
+            return True
+        domain = domain.partition(".")[2]
+    return False
 
 
-def count_any(text: str, terms: List[str]) -> int:
-    t = text.lower()
-    return sum(1 for term in terms if term in t)
+@lru_cache(maxsize=8192)
+def _domain_info(sender: str) -> Tuple[str, bool]:
+    # Sender addresses repeat heavily in real inboxes, so the domain parsing is memoized per sender.
+    domain = extract_email_domain(sender) or ""
+    return domain, is_free_domain(domain) if domain else True
 
 
-def find_money(text: str) -> List[str]:
-    patterns = [
-        r"€\s?\d[\d.,]*\b",
-        r"\$\s?\d[\d.,]*\b",
-        r"\b\d[\d.,]*\s?(m|million|millones|b|billion|mil)\b",
-        r"\b\d{2,}\s?€\b",
-        r"\b\d{2,}\s?\$\b",
-    ]
-    found = []
-    for p in patterns:
-        found.extend(re.findall(p, text, flags=re.IGNORECASE))
-    return list(set([str(x) for x in found if str(x).strip()]))
+def _find_lowered(
+    pattern: re.Pattern, pattern_ci: re.Pattern, texts: Sequence[str], texts_lower: Optional[Sequence[str]]
+) -> Tuple[str, ...]:
+    # Match on the lowercased text but report the original spelling. Texts where that is not
+    # equivalent to re.IGNORECASE are matched case-insensitively instead: "İ" changes the offsets
+    # when lowercased, and "ı"/"ſ" fold to "i"/"s" under IGNORECASE but are left alone by lower().
+    if texts_lower is None:
+        texts_lower = [text.lower() for text in texts]
+    found = set()
+    for text, text_lower in zip(texts, texts_lower):
+        if len(text) == len(text_lower) and "ı" not in text_lower and "ſ" not in text_lower:
+            found.update(text[m.start():m.end()] for m in pattern.finditer(text_lower))
+        else:
+            found.update(m.group(0) for m in pattern_ci.finditer(text))
+    return tuple(found)
+
+
+def find_money(*texts: str, texts_lower: Optional[Sequence[str]] = None) -> Tuple[str, ...]:
+    return _find_lowered(_MONEY_RE, _MONEY_RE_CI, texts, texts_lower)
 
 
-def find_urls(text: str) -> List[str]:
-    return list(set(re.findall(r"https?://\S+|www\.\S+", text, flags=re.IGNORECASE)))
+def find_urls(*texts: str, texts_lower: Optional[Sequence[str]] = None) -> Tuple[str, ...]:
+    return _find_lowered(_URL_RE, _URL_RE_CI, texts, texts_lower)
 
 
-def find_phones(text: str) -> List[str]:
-    return list(set(re.findall(r"\+?\d[\d\s().-]{7,}\d", text)))
+def find_phones(*texts: str) -> Tuple[str, ...]:
+    return tuple({m.group(0) for text in texts for m in _PHONE_RE.finditer(text)})
 
 
-def score_intents(subject: str, body: str) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
-    text = (subject + "\n" + body).lower()
-    scores = {k: 0 for k in INTENT_RULES.keys()}
-    evidence = {k: [] for k in INTENT_RULES.keys()}
+class IntentScores(NamedTuple):
+    # One field per INTENT_RULES entry, in the same order.
+    m_and_a: int
+    legal: int
+    security: int
+    sales: int
+    support: int
 
-    for intent, rule in INTENT_RULES.items():
-        hits = []
-        for term in rule["terms"]:
-            if term.lower() in text:
-                hits.append(term)
-        if hits:
-            scores[intent] += rule["weight"] * len(set(hits))
-            evidence[intent] = sorted(set(hits))
+    def as_dict(self) -> Dict[str, int]:
+        return dict(zip(INTENT_RULES, self))
 
+
+def score_intents(
+    term_hits: Dict[str, Set[str]], collect_evidence: bool = True
+) -> Tuple[IntentScores, Optional[Dict[str, List[str]]]]:
+    scores = IntentScores._make(weight * len(term_hits[intent]) for intent, weight, _ in _COMPILED_RULES)
+    evidence = {intent: sorted(term_hits[intent]) for intent in INTENT_RULES} if collect_evidence else None
     return scores, evidence
 
 
-def extract_features(email: Email) -> Dict:
-    domain = extract_email_domain(email.sender) or ""
-    sender_is_free = domain in FREE_DOMAINS if domain else True
+def extract_features(
+    sender: str, texts: Tuple[str, ...], texts_lower: Tuple[str, ...], term_hits: Dict[str, Set[str]]
+) -> Features:
+    domain, sender_is_free = _domain_info(sender)
 
-    text = f"{email.subject}\n{email.body}"
+    # Cheap literal prefilters: every URL match contains a URL cue term (found by the keyword
+    # scan) and every money or phone match contains a digit, so skip regex passes that cannot hit.
+    has_digits = any(_DIGIT_RE.search(text) for text in texts)
 
-    return {
-        "sender_domain": domain,
-        "sender_is_free_domain": sender_is_free,
-        "mentions_roles": contains_any(text, ROLE_TERMS),
-        "role_hits": count_any(text, ROLE_TERMS),
-        "mentions_urgency": contains_any(text, URGENCY_TERMS),
-        "urgency_hits": count_any(text, URGENCY_TERMS),
-        "money_mentions": find_money(text),
-        "urls": find_urls(text),
-        "phones": find_phones(text),
-        "length": len(text),
-    }
+    return Features(
+        sender_domain=domain,
+        sender_is_free_domain=sender_is_free,
+        role_hits=len(term_hits["ROLES"]),
+        urgency_hits=len(term_hits["URGENCY"]),
+        money_mentions=find_money(*texts, texts_lower=texts_lower) if has_digits else (),
+        urls=find_urls(*texts, texts_lower=texts_lower) if term_hits["URL_CUES"] else (),
+        phones=find_phones(*texts) if has_digits else (),
+        length=sum(map(len, texts)) + len(texts) - 1,
+    )
 
 
-def decide_action(email: Email) -> Dict:
-    scores, intent_evidence = score_intents(email.subject, email.body)
-    features = extract_features(email)
+ACTIONS = ("BLOCK", "ESCALATE_HUMAN", "AUTO_REPLY")
+ACTION_BLOCK, ACTION_ESCALATE_HUMAN, ACTION_AUTO_REPLY = range(len(ACTIONS))
 
-    support_like = scores.get("SUPPORT", 0) >= 1
-    security_like = scores.get("SECURITY", 0) > 0
-    strong_security_terms = ["breach", "hack", "phishing", "wire transfer", "bank details", "datos bancarios", "transferencia"]
-    text_all = (email.subject + "\n" + email.body).lower()
-    has_strong_security = any(t in text_all for t in strong_security_terms)
 
-    if support_like and security_like and not has_strong_security:
-        scores["SECURITY"] = 0
+# Bits of the decision mask computed by _score; the action for every mask is precomputed in _ACTION_LUT.
+SIGNAL_SECURITY_HIGH = 1 << 0
+SIGNAL_LOW_TRUST = 1 << 1
+SIGNAL_M_AND_A_HIGH = 1 << 2
+SIGNAL_LEGAL_HIGH = 1 << 3
+SIGNAL_ROLES = 1 << 4
+SIGNAL_URGENCY = 1 << 5
+SIGNAL_MONEY = 1 << 6
+SIGNAL_RISK_HIGH = 1 << 7
+
+
+def _action_for_mask(mask: int) -> int:
+    if mask & SIGNAL_SECURITY_HIGH and mask & SIGNAL_LOW_TRUST:
+        return ACTION_BLOCK
+    if mask & (SIGNAL_M_AND_A_HIGH | SIGNAL_LEGAL_HIGH):
+        return ACTION_ESCALATE_HUMAN
+    if mask & (SIGNAL_ROLES | SIGNAL_URGENCY | SIGNAL_MONEY) == SIGNAL_ROLES | SIGNAL_URGENCY | SIGNAL_MONEY:
+        return ACTION_ESCALATE_HUMAN
+    if mask & SIGNAL_RISK_HIGH:
+        return ACTION_ESCALATE_HUMAN
+    return ACTION_AUTO_REPLY
+
+
+_ACTION_LUT = tuple(_action_for_mask(mask) for mask in range(1 << 8))
+
+
+@njit(cache=True)
+def _score(m_and_a, legal, security, mentions_roles, mentions_urgency, has_money, url_count, phone_count,
+           sender_is_free_domain):
+    # Branchless arithmetic over the extracted signals so it can be JIT-compiled; returns (action id, total risk).
+    roles = int(mentions_roles != 0)
+    urgency = int(mentions_urgency != 0)
+    money = int(has_money != 0)
 
     strategic_risk = 0.0
-    strategic_risk += scores.get("M_AND_A", 0) * 1.2
-    strategic_risk += (4 if features["mentions_roles"] else 0)
-    strategic_risk += (2 if features["mentions_urgency"] else 0)
-    strategic_risk += (3 if features["money_mentions"] else 0)
+    strategic_risk += m_and_a * 1.2
+    strategic_risk += 4 * roles
+    strategic_risk += 2 * urgency
+    strategic_risk += 3 * money
 
     operational_risk = 0.0
-    operational_risk += scores.get("SECURITY", 0) * 1.3
-    operational_risk += scores.get("LEGAL", 0) * 1.1
+    operational_risk += security * 1.3
+    operational_risk += legal * 1.1
 
     trust_penalty = 0.0
-    if features["sender_is_free_domain"]:
-        trust_penalty += 2
-    if len(features["urls"]) >= 2:
-        trust_penalty += 2
-    if len(features["phones"]) >= 1 and scores.get("SECURITY", 0) > 0:
-        trust_penalty += 2
+    trust_penalty += 2 * int(sender_is_free_domain != 0)
+    trust_penalty += 2 * int(url_count >= 2)
+    trust_penalty += 2 * (int(phone_count >= 1) & int(security > 0))
 
     total_risk = strategic_risk + operational_risk + trust_penalty
 
-    if scores.get("SECURITY", 0) >= 10 and trust_penalty >= 3:
-        action = "BLOCK"
-    elif scores.get("M_AND_A", 0) >= 5 or scores.get("LEGAL", 0) >= 8:
-        action = "ESCALATE_HUMAN"
-    elif (features["mentions_roles"] and features["mentions_urgency"] and features["money_mentions"]):
-        action = "ESCALATE_HUMAN"
-    elif total_risk >= 10:
-        action = "ESCALATE_HUMAN"
-    else:
-        action = "AUTO_REPLY"
+    mask = (
+        int(security >= 10) * SIGNAL_SECURITY_HIGH
+        | int(trust_penalty >= 3) * SIGNAL_LOW_TRUST
+        | int(m_and_a >= 5) * SIGNAL_M_AND_A_HIGH
+        | int(legal >= 8) * SIGNAL_LEGAL_HIGH
+        | roles * SIGNAL_ROLES
+        | urgency * SIGNAL_URGENCY
+        | money * SIGNAL_MONEY
+        | int(total_risk >= 10) * SIGNAL_RISK_HIGH
+    )
+    return _ACTION_LUT[mask], total_risk
+
+
+@njit(parallel=True, cache=True)
+def _score_batch(signals, actions, risks):
+    # signals holds one row per email with the columns of _score, in order.
+    for i in prange(len(signals)):
+        row = signals[i]
+        actions[i], risks[i] = _score(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8])
+
+
+_score(0, 0, 0, False, False, False, 0, 0, False)
+
+
+def _collect_signals(
+    sender: str,
+    texts: Tuple[str, ...],
+    texts_lower: Tuple[str, ...],
+    term_hits: Dict[str, Set[str]],
+    seen_mask: int,
+    collect_evidence: bool,
+) -> Tuple:
+    scores, intent_evidence = score_intents(term_hits, collect_evidence)
+    features = extract_features(sender, texts, texts_lower, term_hits)
+
+    support_like = scores.support >= 1
+    security_like = scores.security > 0
+    has_strong_security = bool(seen_mask & STRONG_SECURITY_BIT)
 
+    if support_like and security_like and not has_strong_security:
+        scores = scores._replace(security=0)
+
+    signals = (
+        scores.m_and_a,
+        scores.legal,
+        scores.security,
+        features.mentions_roles,
+        features.mentions_urgency,
+        bool(features.money_mentions),
+        len(features.urls),
+        len(features.phones),
+        features.sender_is_free_domain,
+    )
+    return scores, intent_evidence, features, signals
+
+
+@lru_cache(maxsize=4096)
+def _decide_core(sender: str, subject: str, body: str, collect_evidence: bool) -> Tuple:
+    # Cached on the raw email fields, so everything returned here must be immutable.
+    texts = (subject, body)
+    texts_lower = (subject.lower(), body.lower())
+    term_hits, seen_mask = scan_terms(*texts_lower)
+    scores, intent_evidence, features, signals = _collect_signals(
+        sender, texts, texts_lower, term_hits, seen_mask, collect_evidence
+    )
+    action_id, total_risk = _score(*signals)
+
+    return (
+        ACTIONS[action_id],
+        round(total_risk, 2),
+        scores,
+        tuple((k, tuple(v)) for k, v in intent_evidence.items()) if collect_evidence else None,
+        features,
+    )
+
+
+def decide_action(email: Email, return_evidence: bool = True) -> Dict:
+    action, risk, scores, intent_evidence, features = _decide_core(
+        email.sender, email.subject, email.body, return_evidence
+    )
     return {
         "action": action,
-        "risk": round(total_risk, 2),
-        "intent_scores": scores,
-        "intent_evidence": intent_evidence,
-        "features": features
+        "risk": risk,
+        "intent_scores": scores.as_dict(),
+        "intent_evidence": {k: list(v) for k, v in intent_evidence} if return_evidence else None,
+        "features": features.as_dict(),
     }
 
 
+def decide_actions(emails: List[Email], return_evidence: bool = True) -> List[Dict]:
+    texts_lower = [(email.subject.lower(), email.body.lower()) for email in emails]
+    scanned = scan_terms_batch(texts_lower)
+
+    collected = []
+    rows = []
+    for email, email_texts_lower, (term_hits, seen_mask) in zip(emails, texts_lower, scanned):
+        scores, intent_evidence, features, signals = _collect_signals(
+            email.sender, (email.subject, email.body), email_texts_lower, term_hits, seen_mask, return_evidence
+        )
+        collected.append((scores, intent_evidence, features))
+        rows.append(signals)
+
+    if np is not None:
+        rows = np.array(rows, dtype=np.int64).reshape(len(rows), 9)
+        actions = np.empty(len(rows), dtype=np.int64)
+        risks = np.empty(len(rows), dtype=np.float64)
+    else:
+        actions = [0] * len(rows)
+        risks = [0.0] * len(rows)
+    _score_batch(rows, actions, risks)
+
+    return [
+        {
+            "action": ACTIONS[action_id],
+            "risk": round(float(total_risk), 2),
+            "intent_scores": scores.as_dict(),
+            "intent_evidence": intent_evidence,
+            "features": features.as_dict(),
+        }
+        for (scores, intent_evidence, features), action_id, total_risk in zip(collected, actions, risks)
+    ]
+
+
 def read_multiline(prompt: str) -> str:
     print(prompt)
     lines = []
@@ -215,7 +521,7 @@ def main():
     body = read_multiline("Paste email body (finish with an empty line):")
 
     email = Email(sender=sender, subject=subject, body=body)
-    decision = decide_action(email)
+    decision = decide_action(email, return_evidence=True)
 
     print("\n--- Decision ---")
     print("Action:", decision["action"])